@@ -4,42 +4,122 @@ Validation script for Customer Profiling and Geographic Distribution sections
 Compares real database data with frontend display
 """
 
-import psycopg2
+import psycopg
+from psycopg.conninfo import make_conninfo
+from psycopg_pool import ConnectionPool, PoolTimeout
 import os
+import sys
 from dotenv import load_dotenv
-import json
+import orjson
+
+load_dotenv()
+
+# Connection settings are resolved once at import; opening a pooled
+# connection never goes back to the environment
+DSN = make_conninfo(
+    host=os.getenv('PG_HOST', 'localhost'),
+    port=os.getenv('PG_PORT', '5432'),
+    dbname=os.getenv('PG_DATABASE', 'mastergroup_recommendations'),
+    user=os.getenv('PG_USER', 'postgres'),
+    password=os.getenv('PG_PASSWORD', ''),
+    sslmode=os.getenv('PG_SSLMODE', 'prefer')
+)
+
+# Seconds to wait for the pool's first connection before giving up
+POOL_OPEN_TIMEOUT = 5
+
+# Shared connection pool, created on first use so importing this module
+# never touches the network
+_pool = None
 
 def get_db_connection():
-    """Establish database connection"""
-    return psycopg2.connect(
-        host=os.getenv('PG_HOST', 'localhost'),
-        port=os.getenv('PG_PORT', '5432'),
-        database=os.getenv('PG_DATABASE', 'mastergroup_recommendations'),
-        user=os.getenv('PG_USER', 'postgres'),
-        password=os.getenv('PG_PASSWORD', ''),
-        sslmode=os.getenv('PG_SSLMODE', 'prefer')
-    )
-
-def validate_customer_profiling():
-    """Validate customer profiling metrics"""
-    print('🔍 VALIDATING CUSTOMER PROFILING METRICS')
-    print('=' * 60)
-    
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # Test customer metrics (same as dashboard API)
-    cursor.execute('''
+    """Borrow a connection from the shared pool"""
+    global _pool
+    if _pool is None:
+        pool = ConnectionPool(
+            DSN,
+            min_size=1,
+            max_size=1,
+            kwargs={'autocommit': True},
+            open=False
+        )
+        try:
+            pool.open(wait=True, timeout=POOL_OPEN_TIMEOUT)
+        except PoolTimeout:
+            # The pool only reports a timeout; connect directly so the
+            # underlying error (bad password, unknown host...) surfaces
+            pool.close()
+            psycopg.connect(DSN, connect_timeout=POOL_OPEN_TIMEOUT).close()
+            raise
+        _pool = pool
+    return _pool.getconn()
+
+def release_db_connection(conn):
+    """Return a borrowed connection to the shared pool"""
+    _pool.putconn(conn)
+
+def close_db_pool():
+    """Close the shared pool if it was ever opened"""
+    global _pool
+    if _pool is not None:
+        _pool.close()
+        _pool = None
+
+def create_recent_orders_table(conn):
+    """Materialize the 30-day order window shared by the validators"""
+    # Dropped at commit so the table never outlives the transaction: a
+    # PgBouncer in transaction mode may hand the next one to another backend
+    conn.execute('''
+        CREATE TEMP TABLE recent_orders_30d ON COMMIT DROP AS
+        SELECT id, unified_customer_id, customer_city, total_price, order_date
+        FROM orders
+        WHERE order_date >= CURRENT_DATE - INTERVAL '30 days'
+    ''')
+    conn.execute('ANALYZE recent_orders_30d')
+
+def query_customer_metrics(conn):
+    """Send the customer metrics query (same as dashboard API) and return its cursor"""
+    return conn.execute('''
         SELECT 
-            COUNT(DISTINCT o.id) as total_orders,
+            COUNT(*) as total_orders,
             COUNT(DISTINCT o.unified_customer_id) as total_customers,
             COALESCE(SUM(o.total_price), 0) as total_revenue,
             COALESCE(AVG(o.total_price), 0) as avg_order_value
-        FROM orders o
-        WHERE o.order_date >= CURRENT_DATE - INTERVAL '30 days'
-    ''')
-    
-    result = cursor.fetchone()
+        FROM recent_orders_30d o
+    ''', binary=True)
+
+def query_geographic_distribution(conn):
+    """Send the top-10 cities query and return its cursor"""
+    # Top-10 totals come back on every row via window sums over the
+    # limited set, so Python never re-aggregates them
+    return conn.execute('''
+        SELECT 
+            t.customer_city,
+            t.customer_count,
+            t.orders,
+            t.revenue,
+            (SUM(t.customer_count) OVER ())::bigint as total_customers,
+            SUM(t.revenue) OVER () as total_revenue
+        FROM (
+            SELECT 
+                o.customer_city,
+                COUNT(DISTINCT o.unified_customer_id) as customer_count,
+                COUNT(*) as orders,
+                COALESCE(SUM(o.total_price), 0) as revenue
+            FROM recent_orders_30d o
+            WHERE o.customer_city IS NOT NULL
+                AND o.customer_city != ''
+            GROUP BY o.customer_city
+            ORDER BY customer_count DESC
+            LIMIT 10
+        ) t
+        ORDER BY t.customer_count DESC
+    ''', binary=True)
+
+def validate_customer_profiling(result):
+    """Validate customer profiling metrics"""
+    print('🔍 VALIDATING CUSTOMER PROFILING METRICS')
+    print('=' * 60)
     
     print('📊 CUSTOMER METRICS (30 days):')
     print(f'  Total Orders: {result[0]:,}')
@@ -56,9 +136,6 @@ def validate_customer_profiling():
     print(f'  Orders per Customer: {result[0] / result[1]:.1f}')
     print()
     
-    cursor.close()
-    conn.close()
-    
     return {
         'total_customers': result[1],
         'total_revenue': result[2],
@@ -66,40 +143,20 @@ def validate_customer_profiling():
         'avg_lifetime_value': avg_lifetime_value
     }
 
-def validate_geographic_distribution():
+def validate_geographic_distribution(results):
     """Validate geographic distribution data"""
     print('🌍 VALIDATING GEOGRAPHIC DISTRIBUTION')
     print('=' * 60)
     
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # Test real geographic distribution
-    cursor.execute('''
-        SELECT 
-            o.customer_city,
-            COUNT(DISTINCT o.unified_customer_id) as customer_count,
-            COUNT(*) as orders,
-            COALESCE(SUM(o.total_price), 0) as revenue
-        FROM orders o
-        WHERE o.order_date >= CURRENT_DATE - INTERVAL '30 days'
-            AND o.customer_city IS NOT NULL
-            AND o.customer_city != ''
-        GROUP BY o.customer_city
-        ORDER BY customer_count DESC
-        LIMIT 10
-    ''')
-    
-    results = cursor.fetchall()
-    
     print('🏙️ TOP 10 CITIES BY CUSTOMER COUNT:')
-    total_customers = sum(row[1] for row in results)
-    total_revenue = sum(row[3] for row in results)
+    total_customers, total_revenue = results[0][4:] if results else (0, 0)
     
-    for i, row in enumerate(results, 1):
-        city, customers, orders, revenue = row
-        percentage = (customers / total_customers) * 100
-        print(f'  {i:2d}. {city:<15}: {customers:4d} customers ({percentage:4.1f}%), PKR {revenue:,.0f}')
+    # Build the listing in memory and write it once instead of per line
+    lines = [
+        f'  {i:2d}. {row[0]:<15}: {row[1]:4d} customers ({row[1] / total_customers * 100:4.1f}%), PKR {row[3]:,.0f}'
+        for i, row in enumerate(results, 1)
+    ]
+    sys.stdout.write(''.join(line + '\n' for line in lines))
     
     print()
     print('📊 SUMMARY:')
@@ -108,9 +165,6 @@ def validate_geographic_distribution():
     print(f'  Total Revenue (top 10): PKR {total_revenue:,.0f}')
     print()
     
-    cursor.close()
-    conn.close()
-    
     return results
 
 def compare_with_frontend():
@@ -118,9 +172,22 @@ def compare_with_frontend():
     print('🔄 COMPARING REAL DATA WITH FRONTEND DISPLAY')
     print('=' * 60)
     
-    # Get real data
-    real_metrics = validate_customer_profiling()
-    real_cities = validate_geographic_distribution()
+    # Get real data over a single pooled connection, pipelining the
+    # temp table build and both queries into one round-trip. They share
+    # one transaction so the temp table stays on a single server session.
+    conn = get_db_connection()
+    try:
+        with conn.pipeline(), conn.transaction():
+            create_recent_orders_table(conn)
+            metrics_cursor = query_customer_metrics(conn)
+            cities_cursor = query_geographic_distribution(conn)
+        customer_metrics = metrics_cursor.fetchone()
+        city_rows = cities_cursor.fetchall()
+    finally:
+        release_db_connection(conn)
+    
+    real_metrics = validate_customer_profiling(customer_metrics)
+    real_cities = validate_geographic_distribution(city_rows)
     
     print('❌ FRONTEND MOCK DATA ISSUES FOUND:')
     print()
@@ -140,12 +207,13 @@ def compare_with_frontend():
     
     print()
     print('🌍 REAL DATABASE DISTRIBUTION:')
-    total_real_customers = sum(city[1] for city in real_cities)
+    total_real_customers = real_cities[0][4] if real_cities else 0
     
-    for i, city_data in enumerate(real_cities[:5], 1):
-        city, customers, orders, revenue = city_data
-        percentage = (customers / total_real_customers) * 100
-        print(f'  {i}. {city:<12}: {percentage:3.1f}% ({customers} customers - REAL DATA)')
+    lines = [
+        f'  {i}. {city_data[0]:<12}: {city_data[1] / total_real_customers * 100:3.1f}% ({city_data[1]} customers - REAL DATA)'
+        for i, city_data in enumerate(real_cities[:5], 1)
+    ]
+    sys.stdout.write(''.join(line + '\n' for line in lines))
     
     print()
     print('🚨 KEY DIFFERENCES:')
@@ -156,7 +224,7 @@ def compare_with_frontend():
     
     return {
         'real_metrics': real_metrics,
-        'real_cities': real_cities,
+        'real_cities': [city_data[:4] for city_data in real_cities],
         'frontend_issues': [
             'Uses mock geographic distribution instead of real data',
             'Shows incorrect city rankings',
@@ -185,8 +253,8 @@ def main():
         print('  5. Add revenue data per city for business insights')
         
         # Save results to file
-        with open('customer_profiling_validation.json', 'w') as f:
-            json.dump(validation_results, f, indent=2, default=str)
+        with open('customer_profiling_validation.json', 'wb') as f:
+            f.write(orjson.dumps(validation_results, option=orjson.OPT_INDENT_2, default=str))
         
         print()
         print('💾 Results saved to: customer_profiling_validation.json')
@@ -195,6 +263,8 @@ def main():
         print(f'❌ Validation failed: {e}')
         import traceback
         traceback.print_exc()
+    finally:
+        close_db_pool()
 
 if __name__ == '__main__':
     main()
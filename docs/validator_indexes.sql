@@ -0,0 +1,20 @@
+-- Supporting indexes for the validation scripts in this directory.
+-- Applied by validate_metrics.py at startup; every statement is idempotent.
+-- A build that fails midway leaves an INVALID index behind that IF NOT EXISTS
+-- will skip; the script reports those so they can be dropped and rebuilt.
+-- Statements run one at a time in autocommit mode because
+-- CREATE INDEX CONCURRENTLY cannot run inside a transaction block.
+
+-- Trailing date-range scans on orders (30/90/180 days), covering the columns
+-- the validators read so the heap is not visited
+CREATE INDEX CONCURRENTLY IF NOT EXISTS orders_recent_idx
+    ON orders (order_date)
+    INCLUDE (id, unified_customer_id, total_price, customer_city);
+
+-- High-value pairs: order_items probed by order, pairing on product
+CREATE INDEX CONCURRENTLY IF NOT EXISTS order_items_order_product_idx
+    ON order_items (order_id, product_id, total_price);
+
+-- Cross-region products: grouping by product
+CREATE INDEX CONCURRENTLY IF NOT EXISTS order_items_product_order_idx
+    ON order_items (product_id, order_id);